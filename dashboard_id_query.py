@@ -1,69 +1,377 @@
 import os
+import sys
+import time
 import getpass
-import requests
-from typing import Dict, Any
+import hashlib
+import sqlite3
+import argparse
+import asyncio
+import httpx
+from aiolimiter import AsyncLimiter
+from typing import Dict, Any, List, Optional, Tuple
 
-def get_dashboard_details(grafana_server: str, dashboard_uid: str, headers: Dict[str, str]) -> Dict[str, Any]:
-    """Fetch detailed dashboard information including panels."""
+try:
+    from orjson import loads as json_loads
+except ImportError:  # orjson is optional; the stdlib decoder is slower but equivalent here
+    from json import loads as json_loads
+
+try:
+    from uvloop import run as run_event_loop
+except ImportError:  # uvloop is optional and unavailable on Windows; use the stock event loop
+    from asyncio import run as run_event_loop
+
+try:
+    import h2  # noqa: F401 -- only needed so httpx can negotiate HTTP/2
+    HTTP2_AVAILABLE = True
+except ImportError:  # without h2, httpx speaks HTTP/1.1 over the same connection pool
+    HTTP2_AVAILABLE = False
+
+CACHE_PATH = os.path.expanduser("~/.cache/grafana_tools.sqlite")
+
+# Cache lifetimes in seconds. Dashboard lists change more often than dashboard contents.
+CACHE_TTLS = {
+    "short": 300,
+    "normal": 3600,
+    "long": 86400,
+}
+
+# Grafana caps /api/search at 5000 results per page (1000 when no limit is given)
+SEARCH_PAGE_LIMIT = 5000
+# Number of further search pages requested concurrently once the first page comes back full
+SEARCH_PAGE_WINDOW = 4
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="List Grafana dashboards and their panels.")
+    parser.add_argument('--api-key-file', default=None,
+                        help='Read the Grafana API key from this file instead of GRAFANA_API_KEY')
+    parser.add_argument('--concurrency', type=int, default=10,
+                        help='Maximum number of in-flight dashboard detail fetches (default: 10)')
+    parser.add_argument('--pool-size', type=int, default=None,
+                        help='Maximum number of connections to Grafana; HTTP/2 servers normally need only one '
+                             '(default: same as --concurrency)')
+    parser.add_argument('--max-retries', type=int, default=5,
+                        help='Retries per request on connection errors and HTTP 429/5xx responses (default: 5)')
+    parser.add_argument('--max-rate', type=float, default=50,
+                        help='Maximum requests started per second, 0 for no limit (default: 50)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help=f'Always query Grafana instead of using the response cache in {CACHE_PATH}')
+    parser.add_argument('--cache-ttl', type=int, default=None,
+                        help='Override the cache lifetime for all responses, in seconds '
+                             f'(default: {CACHE_TTLS["short"]} for search, {CACHE_TTLS["normal"]} for dashboards)')
+    args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error("--concurrency must be 1 or greater")
+    if args.pool_size is not None and args.pool_size < 1:
+        parser.error("--pool-size must be 1 or greater")
+    if args.max_retries < 0:
+        parser.error("--max-retries must be 0 or greater")
+    if args.max_rate < 0:
+        parser.error("--max-rate must be 0 or greater")
+    return args
+
+class ResponseCache:
+    """SQLite-backed cache of GET response bodies, keyed on URL and API key."""
+
+    def __init__(self, path: str, auth_header: str, ttl_override: Optional[int] = None):
+        # Cached dashboards are filtered by the caller's permissions; keep them private to this user
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        os.close(os.open(path, os.O_CREAT | os.O_RDWR, 0o600))
+        os.chmod(path, 0o600)
+        # Autocommit each write so concurrent runs don't block on a write lock held for a whole run
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        # Entries record when they were fetched; expiry is decided at read time so that
+        # --cache-ttl applies to responses cached by earlier runs too
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS cached_responses "
+            "(key TEXT PRIMARY KEY, body BLOB, etag TEXT, fetched_at REAL)"
+        )
+        # Hash the API key so different keys never share cached (permission-filtered) results
+        self.auth_fingerprint = hashlib.sha256(auth_header.encode()).hexdigest()
+        self.ttl_override = ttl_override
+        self.prune()
+
+    def ttl(self, tier: str) -> int:
+        if self.ttl_override is not None:
+            return self.ttl_override
+        return CACHE_TTLS[tier]
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha256(f"{url}\0{self.auth_fingerprint}".encode()).hexdigest()
+
+    def get(self, url: str) -> Optional[Tuple[bytes, Optional[str], float]]:
+        """Return (body, etag, fetched_at) for a URL, or None if it was never cached."""
+        return self.conn.execute(
+            "SELECT body, etag, fetched_at FROM cached_responses WHERE key = ?", (self._key(url),)
+        ).fetchone()
+
+    def put(self, url: str, body: bytes, etag: Optional[str]):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO cached_responses (key, body, etag, fetched_at) VALUES (?, ?, ?, ?)",
+            (self._key(url), body, etag, time.time()),
+        )
+
+    def refresh(self, url: str):
+        """Restart the lifetime of an entry that the server confirmed is unchanged."""
+        self.conn.execute(
+            "UPDATE cached_responses SET fetched_at = ? WHERE key = ?", (time.time(), self._key(url))
+        )
+
+    def prune(self):
+        """Delete entries older than the longest TTL; they are too stale to be worth revalidating."""
+        max_age = max(max(CACHE_TTLS.values()), self.ttl_override or 0)
+        self.conn.execute("DELETE FROM cached_responses WHERE fetched_at < ?", (time.time() - max_age,))
+
+    def close(self):
+        self.conn.close()
+
+class RequestThrottle:
+    """Caps in-flight requests and smooths their start rate to stay under Grafana's rate limits."""
+
+    def __init__(self, concurrency: int, max_rate: float):
+        self.sem = asyncio.Semaphore(concurrency)
+        if not max_rate:
+            self.limiter = None
+        elif max_rate < 1:
+            # AsyncLimiter can't hand out fractional tokens; spread one token over a longer period
+            self.limiter = AsyncLimiter(1, time_period=1 / max_rate)
+        else:
+            self.limiter = AsyncLimiter(max_rate, time_period=1.0)
+
+    async def __aenter__(self):
+        # Wait for a rate-limit token before taking an in-flight slot, so slots aren't held idle
+        if self.limiter is not None:
+            await self.limiter.acquire()
+        await self.sem.acquire()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.sem.release()
+
+def is_retryable_status(status: int) -> bool:
+    """Return True for responses that indicate Grafana is throttling or overloaded."""
+    return status == 429 or 500 <= status < 600
+
+async def get_with_retry(client: httpx.AsyncClient, url: str, throttle: RequestThrottle,
+                         max_retries: int = 5,
+                         headers: Optional[Dict[str, str]] = None) -> Tuple[int, bytes, Optional[str]]:
+    """GET a URL and return (status, body, etag).
+
+    Retries with exponential backoff on HTTP 429/5xx and on transport errors
+    (refused or dropped connections, timeouts). The throttle slot is released
+    while backing off so other fetches can proceed. Raises httpx.TransportError
+    if the last attempt fails at the transport level.
+    """
+    for attempt in range(max_retries + 1):
+        async with throttle:
+            try:
+                response = await client.get(url, headers=headers)
+            except httpx.TransportError:
+                if attempt == max_retries:
+                    raise
+            else:
+                if not is_retryable_status(response.status_code) or attempt == max_retries:
+                    return response.status_code, response.content, response.headers.get("ETag")
+        await asyncio.sleep(2 ** attempt)
+
+async def cached_get(client: httpx.AsyncClient, url: str, throttle: RequestThrottle, max_retries: int,
+                     cache: Optional[ResponseCache], ttl_tier: str) -> Tuple[int, bytes]:
+    """GET a URL through the response cache and return (status, body).
+
+    Unexpired cache entries are returned without touching the network. Expired
+    entries are revalidated with If-None-Match, so an unchanged resource costs a
+    304 instead of a full body. Only successful responses are cached.
+    """
+    if cache is None:
+        status, body, _ = await get_with_retry(client, url, throttle, max_retries)
+        return status, body
+
+    cached = cache.get(url)
+    if cached and cached[2] + cache.ttl(ttl_tier) > time.time():
+        return 200, cached[0]
+
+    conditional_headers = None
+    if cached and cached[1]:
+        conditional_headers = {"If-None-Match": cached[1]}
+
+    status, body, etag = await get_with_retry(client, url, throttle, max_retries, conditional_headers)
+    if status == 304 and cached:
+        cache.refresh(url)
+        return 200, cached[0]
+    if status == 200:
+        cache.put(url, body, etag)
+    return status, body
+
+async def get_dashboard_panels(client: httpx.AsyncClient, grafana_server: str, dashboard_uid: str,
+                               throttle: RequestThrottle, max_retries: int = 5,
+                               cache: Optional[ResponseCache] = None) -> Optional[List[Dict[str, Any]]]:
+    """Fetch the panels of a dashboard, or None if the dashboard could not be retrieved."""
     url = f"{grafana_server}/api/dashboards/uid/{dashboard_uid}"
-    response = requests.get(url, headers=headers)
-    if response.status_code == 200:
-        return response.json()
+    try:
+        status, body = await cached_get(client, url, throttle, max_retries, cache, "normal")
+    except httpx.TransportError:
+        return None
+    if status == 200:
+        try:
+            details = json_loads(body)
+        except ValueError:
+            # e.g. an HTML login page from a proxy in front of Grafana
+            return None
+        if 'dashboard' not in details:
+            return None
+        return details['dashboard'].get('panels', [])
     return None
 
+def iter_panels(panels):
+    """Yield each panel, including panels nested inside collapsed rows."""
+    for panel in panels:
+        yield panel
+        nested = panel.get('panels') if isinstance(panel, dict) else None
+        if isinstance(nested, list):
+            yield from iter_panels(nested)
+
+async def search_dashboards(client: httpx.AsyncClient, grafana_server: str, throttle: RequestThrottle,
+                            max_retries: int = 5, cache: Optional[ResponseCache] = None):
+    """Return (status, body, dashboards) for all dashboards, following search pagination.
+
+    The first page is fetched on its own since it is usually the only one. If it
+    is full, later pages are fetched SEARCH_PAGE_WINDOW at a time until a short
+    page is seen, or a page with no new UIDs (a server that ignores the page
+    parameter would otherwise return the same full page forever). On failure, status and body describe the failing page and
+    dashboards is None.
+    """
+    def page_url(page: int) -> str:
+        return f"{grafana_server}/api/search?type=dash-db&limit={SEARCH_PAGE_LIMIT}&page={page}"
+
+    dashboards = []
+    seen_uids = set()
+    next_page = 1
+    window = 1
+    while True:
+        pages = range(next_page, next_page + window)
+        responses = await asyncio.gather(
+            *[cached_get(client, page_url(page), throttle, max_retries, cache, "short") for page in pages]
+        )
+        for status, body in responses:
+            if status != 200:
+                return status, body, None
+            results = json_loads(body)
+            page_uids = {dashboard['uid'] for dashboard in results}
+            if results and page_uids <= seen_uids:
+                return status, body, dashboards
+            seen_uids |= page_uids
+            dashboards.extend(results)
+            if len(results) < SEARCH_PAGE_LIMIT:
+                return status, body, dashboards
+        next_page += window
+        window = SEARCH_PAGE_WINDOW
+
+async def query_grafana(grafana_server: str, headers: Dict[str, str], args):
+    """Search for dashboards and fetch all their panels over a single pooled HTTP client.
+
+    With HTTP/2 (when h2 is installed) the concurrent requests are multiplexed over one connection per
+    server instead of each needing its own keep-alive connection.
+
+    Returns (search_status, search_body, dashboards, all_panels); the last two are
+    None if the search request failed. Panels are returned in dashboard order.
+    """
+    concurrency = args.concurrency
+    pool_size = args.pool_size if args.pool_size is not None else concurrency
+
+    cache = None
+    if not args.no_cache:
+        cache = ResponseCache(CACHE_PATH, headers["Authorization"], args.cache_ttl)
+
+    throttle = RequestThrottle(concurrency, args.max_rate)
+    limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+    try:
+        async with httpx.AsyncClient(http2=HTTP2_AVAILABLE, headers=headers, limits=limits, timeout=30.0) as client:
+            status, body, dashboards = await search_dashboards(client, grafana_server, throttle, args.max_retries, cache)
+            if status != 200:
+                return status, body, None, None
+
+            # Search can list the same dashboard more than once; fetch each UID only once
+            unique_uids = list(dict.fromkeys(dashboard['uid'] for dashboard in dashboards))
+            unique_panels = await asyncio.gather(
+                *[get_dashboard_panels(client, grafana_server, uid, throttle, args.max_retries, cache)
+                  for uid in unique_uids]
+            )
+            panels_by_uid = dict(zip(unique_uids, unique_panels))
+            all_panels = [panels_by_uid[dashboard['uid']] for dashboard in dashboards]
+            return status, body, dashboards, all_panels
+    finally:
+        if cache is not None:
+            cache.close()
+
 def main():
-    # Check if GRAFANA_API_KEY is set in environment variables
-    grafana_api_key = os.getenv("GRAFANA_API_KEY")
+    # Panel titles and the bullet below are non-ASCII; don't depend on the locale's encoding.
+    # Output is written in one chunk per dashboard, so line buffering would only add flushes.
+    sys.stdout.reconfigure(encoding="utf-8", line_buffering=False)
+    args = parse_args()
+
+    # Prefer an explicit key file, then the GRAFANA_API_KEY environment variable
+    if args.api_key_file:
+        try:
+            with open(args.api_key_file) as f:
+                grafana_api_key = f.read().strip()
+        except OSError as e:
+            sys.exit(f"Could not read API key file {args.api_key_file}: {e.strerror}")
+        if not grafana_api_key:
+            sys.exit(f"API key file {args.api_key_file} is empty")
+    else:
+        grafana_api_key = os.getenv("GRAFANA_API_KEY")
 
-    # If not present, prompt for it
+    # If not present, prompt for it; without a terminal (cron, CI) the prompt would hang
     if not grafana_api_key:
+        if not sys.stdin.isatty():
+            sys.exit("GRAFANA_API_KEY not set and no TTY to prompt from (use --api-key-file)")
         grafana_api_key = getpass.getpass("Enter your Grafana API key: ")
 
     grafana_server = "https://main-grafana-route-ai-grafana-main.apps.ocp01.pg.wwtatc.ai"
-    search_api_url = f"{grafana_server}/api/search?type=dash-db"
 
     headers = {
         "Authorization": f"Bearer {grafana_api_key}",
         "Content-Type": "application/json",
     }
 
-    response = requests.get(search_api_url, headers=headers)
-    if response.status_code == 200:
-        dashboards = response.json()
+    # Fetch the dashboard list and all panels up front, then print in the original order
+    try:
+        status, body, dashboards, all_panels = run_event_loop(query_grafana(grafana_server, headers, args))
+    except httpx.TransportError as e:
+        print(f"Failed to retrieve dashboards. Could not connect to Grafana: {e!r}")
+        return
+    if status == 200:
         print("\n=== Grafana Dashboards and Panels ===\n")
-        
-        for dashboard in dashboards:
-            print(f"{'='*80}")
-            print(f"Dashboard: {dashboard['title']}")
-            print(f"ID: {dashboard['id']}")
-            print(f"UID: {dashboard['uid']}")
-            
-            # Get detailed dashboard info including panels
-            details = get_dashboard_details(grafana_server, dashboard['uid'], headers)
-            if details and 'dashboard' in details:
-                panels = details['dashboard'].get('panels', [])
+
+        for dashboard, panels in zip(dashboards, all_panels):
+            # Collect each dashboard's output and write it in a single call
+            out = [
+                f"{'='*80}\n",
+                f"Dashboard: {dashboard['title']}\n",
+                f"ID: {dashboard['id']}\n",
+                f"UID: {dashboard['uid']}\n",
+            ]
+
+            if panels is not None:
                 if panels:
-                    print("\nPanels:")
-                    print("-" * 40)
-                    for panel in panels:
+                    out.append("\nPanels:\n")
+                    out.append("-" * 40 + "\n")
+                    for panel in iter_panels(panels):
                         try:
                             # Use .get() method with a default value for safer access
                             title = panel.get('title', 'Untitled Panel')
                             panel_id = panel.get('id', 'No ID')
-                            print(f"  • {title}")
-                            print(f"    ID: {panel_id}")
-                            print()
+                            out.append(f"  \u2022 {title}\n    ID: {panel_id}\n\n")
                         except Exception as e:
-                            print(f"    Warning: Could not process panel data: {str(e)}")
+                            out.append(f"    Warning: Could not process panel data: {str(e)}\n")
                             continue
                 else:
-                    print("\nNo panels found in this dashboard")
+                    out.append("\nNo panels found in this dashboard\n")
             else:
-                print("\nCould not retrieve panel information for this dashboard")
-            print()
+                out.append("\nCould not retrieve panel information for this dashboard\n")
+            out.append("\n")
+            sys.stdout.write("".join(out))
     else:
-        print(f"Failed to retrieve dashboards. HTTP Status Code: {response.status_code}")
-        print(f"Response: {response.text}")
+        print(f"Failed to retrieve dashboards. HTTP Status Code: {status}")
+        print(f"Response: {body.decode(errors='replace')}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
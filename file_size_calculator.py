@@ -1,7 +1,7 @@
-import math
-import readline  # Enables proper backspace handling on Unix-like systems
-import argparse
+import sys
+import functools
 
+@functools.lru_cache(maxsize=None)
 def calculate_adjusted_file_size(total_volume_gib, num_files):
     """
     Calculate the file size in MiB for each file such that the total volume 
@@ -9,6 +9,12 @@ def calculate_adjusted_file_size(total_volume_gib, num_files):
     round it up to the nearest multiple of 4. If it's less than 4 MiB, round up 
     to the nearest integer.
     
+    The division is done in exact integer arithmetic, and results are memoized
+    for repeated (total_volume_gib, num_files) pairs. This is the reference
+    implementation of the rounding rule; calculate_adjusted_file_sizes and
+    calculate_adjusted_file_size_bulk are float-based fast paths for many
+    counts at once.
+    
     Parameters:
         total_volume_gib (float): Total data volume in GiB.
         num_files (int): Number of files.
@@ -16,15 +22,117 @@ def calculate_adjusted_file_size(total_volume_gib, num_files):
     Returns:
         int: Adjusted file size in MiB.
     """
-    total_volume_mib = total_volume_gib * 1024  # Convert GiB to MiB
-    raw_size_mib = total_volume_mib / num_files
+    # Total volume in MiB as an exact fraction numerator / denominator. Coerce first
+    # so NumPy scalars from sweep callers get Python's exact, unbounded arithmetic.
+    numerator, denominator = (float(total_volume_gib) * 1024).as_integer_ratio()
     
-    if raw_size_mib >= 4:
-        adjusted_size_mib = math.ceil(raw_size_mib / 4) * 4
-    else:
-        adjusted_size_mib = math.ceil(raw_size_mib)
+    # Ceiling division: whole MiB per file, rounded up
+    quotient, remainder = divmod(numerator, denominator * int(num_files))
+    size_mib = quotient + (remainder > 0)
+    
+    # Rounding up to whole MiB first doesn't change the multiple-of-4 result,
+    # and anything that rounds up to exactly 4 MiB is already a multiple of 4.
+    return ((size_mib + 3) & ~3) if size_mib >= 4 else size_mib
+
+# Largest volume the float paths accept: counts are >= 1, so per-file sizes stay
+# far enough below 2**63 MiB to fit in int64 after rounding up
+MAX_FLOAT_VOLUME_GIB = 2.0 ** 52
+
+@functools.lru_cache(maxsize=None)
+def _float_rounding_rule():
+    """
+    Return the float form of the rounding rule over NumPy arrays. This single
+    definition is what both the NumPy path and the Numba kernel run.
+    """
+    import numpy as np
+    
+    def adjusted_sizes_mib(volumes_gib, counts):
+        raw_size_mib = volumes_gib * 1024.0 / counts
+        return np.where(raw_size_mib >= 4, np.ceil(raw_size_mib / 4) * 4, np.ceil(raw_size_mib)).astype(np.int64)
+    
+    return adjusted_sizes_mib
+
+def _check_float_inputs(volumes_gib, counts):
+    """Raise ValueError for inputs the float paths would silently turn into garbage sizes."""
+    import numpy as np
     
-    return adjusted_size_mib
+    if not (counts > 0).all():
+        raise ValueError("All file counts must be greater than 0.")
+    if not (np.isfinite(volumes_gib) & (np.abs(volumes_gib) <= MAX_FLOAT_VOLUME_GIB)).all():
+        raise ValueError(f"All volumes must be finite and at most {MAX_FLOAT_VOLUME_GIB:.0f} GiB in magnitude.")
+
+def calculate_adjusted_file_sizes(total_volume_gib, file_counts):
+    """
+    Vectorized form of calculate_adjusted_file_size for many file counts at once.
+    
+    Uses float division, so it can round differently from the exact
+    calculate_adjusted_file_size only when the per-file size is within float
+    precision of a whole MiB. The interactive prompt uses the exact function.
+    
+    Parameters:
+        total_volume_gib (float): Total data volume in GiB.
+        file_counts (array-like of int): Numbers of files, all greater than 0.
+    
+    Returns:
+        numpy.ndarray: Adjusted file size in MiB for each file count.
+    
+    Raises:
+        ValueError: If a file count is not greater than 0, or the volume is not
+            finite or exceeds MAX_FLOAT_VOLUME_GIB.
+    """
+    import numpy as np
+    
+    volume_gib = np.float64(total_volume_gib)
+    counts = np.asarray(file_counts, dtype=np.int64)
+    _check_float_inputs(volume_gib, counts)
+    return _float_rounding_rule()(volume_gib, counts)
+
+@functools.lru_cache(maxsize=None)
+def _bulk_kernel():
+    """Compile the float rounding rule with Numba for calculate_adjusted_file_size_bulk, or return None without Numba."""
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+    
+    # parallel=True splits the rule's array expressions across threads
+    return njit(parallel=True, cache=True)(_float_rounding_rule())
+
+def calculate_adjusted_file_size_bulk(volumes_gib, counts):
+    """
+    Calculate adjusted file sizes for many (total volume, file count) pairs, e.g.
+    when planning a sweep of elbencho runs. Uses a parallel Numba kernel when
+    Numba is installed and falls back to NumPy otherwise.
+    
+    Parameters:
+        volumes_gib (float or array-like of float): Total data volume(s) in GiB,
+            broadcast against counts.
+        counts (array-like of int): Numbers of files, all greater than 0.
+    
+    Returns:
+        numpy.ndarray: Adjusted file size in MiB for each pair, in the broadcast
+            shape of volumes_gib and counts.
+    
+    Raises:
+        ValueError: If any file count is not greater than 0, or any volume is not
+            finite or exceeds MAX_FLOAT_VOLUME_GIB.
+    """
+    import numpy as np
+    
+    volumes_gib, counts = np.broadcast_arrays(np.asarray(volumes_gib, dtype=np.float64),
+                                              np.asarray(counts, dtype=np.int64))
+    _check_float_inputs(volumes_gib, counts)
+    
+    shape = counts.shape
+    volumes_gib = np.ascontiguousarray(volumes_gib).ravel()
+    counts = np.ascontiguousarray(counts).ravel()
+    
+    kernel = _bulk_kernel()
+    if kernel is None:
+        adjusted_sizes_mib = _float_rounding_rule()(volumes_gib, counts)
+    else:
+        adjusted_sizes_mib = kernel(volumes_gib, counts)
+    return adjusted_sizes_mib.reshape(shape)
 
 def print_help():
     print("""
@@ -50,13 +158,13 @@ Rounding:
 """)
 
 def main():
-    parser = argparse.ArgumentParser(add_help=False)
-    parser.add_argument('-h', '--help', action='store_true', help='Show this help message and exit')
-    args, unknown = parser.parse_known_args()
-    if args.help:
+    # Answer -h/--help before importing anything heavy
+    if "-h" in sys.argv[1:] or "--help" in sys.argv[1:]:
         print_help()
         return
 
+    import readline  # Enables proper backspace handling on Unix-like systems
+
     try:
         total_volume_gib = float(input("Enter the total data volume (GiB): "))
         file_counts_input = input("Enter the number(s) of files (comma separated if multiple): ")
@@ -78,7 +186,8 @@ def main():
             print(f"  {adjusted_size_mib} MiB per file")
             print(f"  {adjusted_size_kib} KiB per file")
         
-    except ValueError:
+    except (ValueError, OverflowError):
+        # nan and inf volumes can't be turned into an exact ratio
         print("Invalid input. Please enter numeric values.")
 
 if __name__ == "__main__":